@@ -39,6 +39,7 @@ from deta_discord_interactions.discord import (
     InteractionType,
     DiscordInteractions,
     DiscordInteractionsBlueprint,
+    DiscordAPIError,
 )
 
 import deta_discord_interactions.models.embed as embed
@@ -64,6 +65,7 @@ __all__ = [
     "InteractionType",
     "DiscordInteractions",
     "DiscordInteractionsBlueprint",
+    "DiscordAPIError",
     "Message",
     "ResponseType",
     "Embed",
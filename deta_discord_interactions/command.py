@@ -99,6 +99,9 @@ class Command:
         self.discord = discord
         self.autocomplete_handler = autocomplete_handler
         self.id = None
+        # Filled in by DiscordInteractions.update_commands,
+        # commands are not expected to change after being registered
+        self._dump_cache = None
 
         if self.name is None:
             self.name = command.__name__
@@ -232,7 +235,7 @@ class Command:
 
         result = self.run(context, *args, **kwargs)
 
-        if isinstance(result, Modal):
+        if isinstance(result, (Message, Modal)):
             return result
         else:
             return Message.from_return_value(result)
@@ -3,7 +3,7 @@ from typing import Callable, Optional, Union, TYPE_CHECKING
 import inspect
 import itertools
 
-import requests
+import orjson
 
 from deta_discord_interactions.models import (
     LoadableDataclass,
@@ -23,6 +23,11 @@ if TYPE_CHECKING:
     from deta_discord_interactions.discord import DiscordInteractions
 
 
+def handler_parameters(handler: Callable) -> tuple[inspect.Parameter, ...]:
+    "Returns the parameters of a custom ID handler after the Context."
+    return tuple(itertools.islice(inspect.signature(handler).parameters.values(), 1, None))
+
+
 @dataclass
 class Context(LoadableDataclass):
     """
@@ -151,7 +156,8 @@ class Context(LoadableDataclass):
 
     @property
     def auth_headers(self):
-        return self.discord.auth_headers()
+        # A copy, so that changes made by the caller do not leak into later API calls
+        return dict(self.discord.auth_headers())
 
     def parse_author(self, data: dict):
         """
@@ -371,7 +377,11 @@ class Context(LoadableDataclass):
 
         return create_args_recursive({"options": self.options}, self.resolved)
 
-    def create_handler_args(self, handler: Callable):
+    def create_handler_args(
+        self,
+        handler: Callable,
+        parameters: tuple[inspect.Parameter, ...] = None,
+    ):
         """
         Create the arguments which will be passed to the function when a
         custom ID handler is invoked.
@@ -380,15 +390,17 @@ class Context(LoadableDataclass):
         ----------
         handler: Callable
             The custom ID handler to create arguments for.
+        parameters: tuple[inspect.Parameter, ...]
+            The handler's parameters after the Context, if already known.
+            If omitted, they are inspected from ``handler``.
         """
 
         args = self.handler_state[1:]
 
-        sig = inspect.signature(handler)
+        if parameters is None:
+            parameters = handler_parameters(handler)
 
-        iterator = zip(
-            itertools.count(), args, itertools.islice(sig.parameters.values(), 1, None)
-        )
+        iterator = zip(itertools.count(), args, parameters)
 
         for i, argument, parameter in iterator:
             annotation = parameter.annotation
@@ -451,12 +463,12 @@ class Context(LoadableDataclass):
             return
 
         response, mimetype = updated.encode(followup=True)
-        updated = requests.patch(
+        self.discord._discord_request(
+            "PATCH",
             self.followup_url(message),
-            data=response,
+            body=response,
             headers={"Content-Type": mimetype},
         )
-        updated.raise_for_status()
 
     def delete(self, message: str = "@original"):
         """
@@ -472,8 +484,7 @@ class Context(LoadableDataclass):
         if not self.discord or self.discord.DONT_REGISTER_WITH_DISCORD:
             return
 
-        response = requests.delete(self.followup_url(message))
-        response.raise_for_status()
+        self.discord._discord_request("DELETE", self.followup_url(message))
 
     def send(self, message: Union[Message, str]):
         """
@@ -491,11 +502,10 @@ class Context(LoadableDataclass):
         message = Message.from_return_value(message)
 
         response, mimetype = message.encode(followup=True)
-        message = requests.post(
-            self.followup_url(), data=response, headers={"Content-Type": mimetype}
+        message = self.discord._discord_request(
+            "POST", self.followup_url(), body=response, headers={"Content-Type": mimetype}
         )
-        message.raise_for_status()
-        return message.json()["id"]
+        return orjson.loads(message.data)["id"]
 
     def get_command(self, command_name: str = None):
         """
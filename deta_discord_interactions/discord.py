@@ -1,9 +1,15 @@
 import os
+import inspect
 import time
-from typing import Callable, NoReturn
-import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, NoReturn, Union
 
+from urllib.parse import urlencode
+
+import orjson
 import requests
+import urllib3
 
 from nacl.exceptions import BadSignatureError
 from nacl.signing import VerifyKey
@@ -11,17 +17,44 @@ from nacl.signing import VerifyKey
 from deta_discord_interactions.models.option import Option
 
 from deta_discord_interactions.command import Command, SlashCommandGroup
-from deta_discord_interactions.context import Context, ApplicationCommandType
+from deta_discord_interactions.context import Context, ApplicationCommandType, handler_parameters
 from deta_discord_interactions.models import Message, Modal, ResponseType, Permission
 
 
+def _env_flag(name: str) -> bool:
+    "Reads a boolean flag from the environment, so that values such as `False` or `0` are treated as disabled."
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes")
+
+
 class AbortError(Exception):
     def __init__(self, http_code):
         self.http_code = http_code
 
+class DiscordAPIError(requests.exceptions.HTTPError):
+    """
+    Raised when the Discord API responds to a request with an error status code.
+
+    Subclasses ``requests.exceptions.HTTPError``, which these requests raised
+    before they were sent through urllib3, so existing handlers still catch it.
+
+    Attributes
+    ----------
+    status: int
+        The HTTP status code of the response.
+    data: bytes
+        The raw body of the response.
+    """
+    def __init__(self, status: int, data: bytes):
+        super().__init__(f"{status} {data.decode('UTF-8', errors='replace')}")
+        self.status = status
+        self.data = data
+
+# The response to a PING never changes, so it is only serialized once
+_PONG_PAYLOAD = orjson.dumps({"type": ResponseType.PONG})
+
 class PongResponse:
     def encode(self):
-        return json.dumps({"type": ResponseType.PONG}).encode('UTF-8'), "application/json"
+        return _PONG_PAYLOAD, "application/json"
 
 
 class InteractionType:
@@ -32,6 +65,10 @@ class InteractionType:
     MODAL_SUBMIT = 5
 
 
+# Bound at module level so that handle_interaction compares against a global rather than a class attribute
+_PING = InteractionType.PING
+
+
 class DiscordInteractionsBlueprint:
     """
     Represents a collection of :class:`ApplicationCommand` s.
@@ -42,6 +79,8 @@ class DiscordInteractionsBlueprint:
     def __init__(self):
         self.discord_commands: dict[str, Command] = {}
         self.custom_id_handlers: dict[str, Callable] = {}
+        # Inspected once when registering, rather than on every interaction
+        self._custom_id_parameters: dict[str, tuple[inspect.Parameter, ...]] = {}
         self.deta_actions: dict[str, Callable] = {}
 
     def add_command(
@@ -237,6 +276,7 @@ class DiscordInteractionsBlueprint:
             The custom ID that the handler will respond to.
         """
         self.custom_id_handlers[custom_id] = handler
+        self._custom_id_parameters[custom_id] = handler_parameters(handler)
         return custom_id
 
     def custom_handler(self, custom_id: str):
@@ -276,11 +316,24 @@ class DiscordInteractions(DiscordInteractionsBlueprint):
             self.discord_client_id = os.environ["DISCORD_CLIENT_ID"]
             self.discord_public_key = os.environ["DISCORD_PUBLIC_KEY"]
             self.discord_client_secret = os.environ["DISCORD_CLIENT_SECRET"]
-            self.discord_scope = os.getenv("DISCORD_SCOPE", "applications.commands.update")
-            self.DONT_REGISTER_WITH_DISCORD = os.getenv("DONT_REGISTER_WITH_DISCORD", False)
-            self.DONT_VALIDATE_SIGNATURE = os.getenv("DONT_VALIDATE_SIGNATURE", False)
         except KeyError:
             raise Exception("Please fill in the .env files with your application's credentials.")
+        self.discord_scope = os.getenv("DISCORD_SCOPE", "applications.commands.update")
+        self._application_url = f"{self.DISCORD_BASE_URL}/applications/{self.discord_client_id}"
+        self.DONT_REGISTER_WITH_DISCORD = _env_flag("DONT_REGISTER_WITH_DISCORD")
+        self.DONT_VALIDATE_SIGNATURE = _env_flag("DONT_VALIDATE_SIGNATURE")
+        # Parsing the public key is only needed (and only valid) when signatures are checked
+        self._verify_key = None
+        if not self.DONT_VALIDATE_SIGNATURE:
+            self._verify_key = VerifyKey(bytes.fromhex(self.discord_public_key))
+        # Reuse connections to the Discord API across requests
+        self._http = urllib3.PoolManager(maxsize=10)
+        self._interaction_handlers = {
+            InteractionType.APPLICATION_COMMAND: self.run_command,
+            InteractionType.MESSAGE_COMPONENT: self.run_handler,
+            InteractionType.APPLICATION_COMMAND_AUTOCOMPLETE: self.run_autocomplete,
+            InteractionType.MODAL_SUBMIT: partial(self.run_handler, allow_modal=False),
+        }
         self.__routes = {}
 
     def fetch_token(self):
@@ -301,36 +354,62 @@ class DiscordInteractions(DiscordInteractionsBlueprint):
             )
             return discord_token
 
-        response = requests.post(
+        response = self._discord_request(
+            "POST",
             self.DISCORD_BASE_URL + "/oauth2/token",
-            data={
+            body=urlencode({
                 "grant_type": "client_credentials",
                 "scope": self.discord_scope,
+            }),
+            headers={
+                "Content-Type": "application/x-www-form-urlencoded",
+                **urllib3.make_headers(
+                    basic_auth=f"{self.discord_client_id}:{self.discord_client_secret}"
+                ),
             },
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-            auth=(self.discord_client_id, self.discord_client_secret),
         )
 
-        response.raise_for_status()
-        discord_token = response.json()
+        discord_token = orjson.loads(response.data)
         discord_token["expires_on"] = (
             time.time() + discord_token["expires_in"] / 2
         )
         return discord_token
 
+    @property
+    def discord_token(self) -> dict:
+        """
+        The OAuth2 token used for requests to the Discord API,
+        as returned by :meth:`fetch_token`.
+        """
+        return self._discord_token
+
+    @discord_token.setter
+    def discord_token(self, token: dict):
+        self._discord_token = token
+        if token is None:
+            self._auth_headers = None
+            self._token_deadline = 0.0
+        else:
+            self._auth_headers = {"Authorization": f"Bearer {token['access_token']}"}
+            # Checked against a clock that is cheap to read and never goes backwards
+            self._token_deadline = time.monotonic() + (token["expires_on"] - time.time())
+
     def auth_headers(self):
         """
         Get the Authorization header required for HTTP requests to the
         Discord API.
 
+        The same dict is returned until the token is refreshed,
+        so it should not be modified.
+
         Returns
         -------
         dict[str, str]
             The Authorization header.
         """
-        if self.discord_token is None or time.time() > self.discord_token["expires_on"]:
+        if self._discord_token is None or time.monotonic() > self._token_deadline:
             self.discord_token = self.fetch_token()
-        return {"Authorization": f"Bearer {self.discord_token['access_token']}"}
+        return self._auth_headers
 
     def update_commands(self, guild_id: str = None, *, from_inside_a_micro: bool = False):
         """
@@ -346,43 +425,150 @@ class DiscordInteractions(DiscordInteractionsBlueprint):
             If you really want to update the commands from inside the micro, set this to True.
             I would strongly advise against it though - at least, do not run this *every time* but from a specific command or route
         """
-        # It *would* work, it's just a big waste and may slow down the bot overall
-        if (os.getenv("DETA_SPACE_APP") is not None) and (from_inside_a_micro == False):
-            raise Exception("Cannot register commands from inside a Deta Micro")
+        self._check_update_from_micro(from_inside_a_micro)
 
         if guild_id:
-            url = (
-                f"{self.DISCORD_BASE_URL}/applications/"
-                f"{self.discord_client_id}/"
-                f"guilds/{guild_id}/commands"
-            )
+            url = f"{self._application_url}/guilds/{guild_id}/commands"
         else:
-            url = (
-                f"{self.DISCORD_BASE_URL}/applications/"
-                f"{self.discord_client_id}/commands"
-            )
+            url = f"{self._application_url}/commands"
 
-        overwrite_data = [command.dump() for command in self.discord_commands.values()]
+        overwrite_data = self._dump_commands()
 
         if not self.DONT_REGISTER_WITH_DISCORD:
-            response = requests.put(
-                url, json=overwrite_data, headers=self.auth_headers()
-            )
+            registered = self._put_commands(url, overwrite_data, self.auth_headers())
+            self._set_command_ids(registered)
+        else:
+            self._set_placeholder_command_ids()
 
-            try:
-                response.raise_for_status()
-            except requests.exceptions.HTTPError:
-                raise ValueError(
-                    f"Unable to register commands:"
-                    f"{response.status_code} {response.text}"
-                )
+    def update_guild_commands(self, guild_ids: list[str], *, from_inside_a_micro: bool = False):
+        """
+        Update the list of commands registered with Discord in multiple guilds at once.
+        This method will overwrite all existing commands in each of the guilds.
 
-            for command in response.json():
-                if command["name"] in self.discord_commands:
-                    self.discord_commands[command["name"]].id = command["id"]
-        else:
-            for command in self.discord_commands.values():
-                command.id = command.name
+        The requests to each guild are sent concurrently,
+        rather than waiting for each one to finish before sending the next.
+
+        Command IDs are specific to each guild, so afterwards each
+        :class:`Command`'s ``id`` holds its ID in the last guild of ``guild_ids``.
+
+        Parameters
+        ----------
+        guild_ids: list[str]
+            The IDs of the Discord guilds to register commands to.
+        from_inside_a_micro: bool
+            If you really want to update the commands from inside the micro, set this to True.
+            I would strongly advise against it though - at least, do not run this *every time* but from a specific command or route
+        """
+        self._check_update_from_micro(from_inside_a_micro)
+
+        overwrite_data = self._dump_commands()
+
+        if self.DONT_REGISTER_WITH_DISCORD:
+            self._set_placeholder_command_ids()
+            return
+
+        # Fetched once up front so that the workers do not all try to refresh the token
+        headers = self.auth_headers()
+        urls = [f"{self._application_url}/guilds/{guild_id}/commands" for guild_id in guild_ids]
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(
+                lambda url: self._put_commands(url, overwrite_data, headers),
+                urls,
+            ))
+
+        for registered in results:
+            self._set_command_ids(registered)
+
+    def _check_update_from_micro(self, from_inside_a_micro: bool):
+        "Raises an error when updating commands from inside a Deta Micro, unless explicitly allowed."
+        # It *would* work, it's just a big waste and may slow down the bot overall
+        if (os.getenv("DETA_SPACE_APP") is not None) and (from_inside_a_micro == False):
+            raise Exception("Cannot register commands from inside a Deta Micro")
+
+    def _set_placeholder_command_ids(self):
+        "Use the names of the commands as their IDs, for when they are not registered with Discord."
+        for command in self.discord_commands.values():
+            command.id = command.name
+
+    def _dump_commands(self) -> list[dict]:
+        "Returns the data for all registered commands, as sent to the Discord API."
+        overwrite_data = []
+        for command in self.discord_commands.values():
+            # Groups may still receive subcommands after registration, so they are always dumped
+            if isinstance(command, SlashCommandGroup):
+                overwrite_data.append(command.dump())
+            else:
+                if command._dump_cache is None:
+                    command._dump_cache = command.dump()
+                overwrite_data.append(command._dump_cache)
+        return overwrite_data
+
+    def _put_commands(self, url: str, overwrite_data: list[dict], headers: dict[str, str]) -> list[dict]:
+        "Overwrite the commands registered at ``url``, returning the registered commands."
+        try:
+            response = self._discord_request("PUT", url, json=overwrite_data, headers=headers)
+        except DiscordAPIError as err:
+            raise ValueError(f"Unable to register commands:{err}") from err
+
+        return orjson.loads(response.data)
+
+    def _set_command_ids(self, registered: list[dict]):
+        "Update the IDs of the local commands using the commands registered with Discord."
+        for command in registered:
+            if command["name"] in self.discord_commands:
+                self.discord_commands[command["name"]].id = command["id"]
+
+    def _discord_request(
+        self,
+        method: str,
+        url: str,
+        *,
+        json=None,
+        body: Union[bytes, str] = None,
+        headers: dict[str, str] = None,
+    ) -> urllib3.HTTPResponse:
+        """
+        Send a request to the Discord API through the shared connection pool.
+
+        Parameters
+        ----------
+        method: str
+            The HTTP method to use.
+        url: str
+            The URL to send the request to.
+        json
+            An object to send as the JSON encoded body of the request.
+        body: Union[bytes, str]
+            The already encoded body of the request, if ``json`` is not provided.
+        headers: dict[str, str]
+            Headers to send with the request.
+
+        Returns
+        -------
+        urllib3.HTTPResponse
+            The response from Discord.
+
+        Raises
+        ------
+        DiscordAPIError
+            If Discord responded with an error status code.
+        requests.exceptions.ConnectionError
+            If the request could not be sent to Discord.
+        """
+        headers = dict(headers) if headers else {}
+        if json is not None:
+            body = orjson.dumps(json)
+            headers["Content-Type"] = "application/json"
+
+        try:
+            response = self._http.request(method, url, body=body, headers=headers)
+        except urllib3.exceptions.HTTPError as err:
+            raise requests.exceptions.ConnectionError(err) from err
+
+        if response.status >= 400:
+            raise DiscordAPIError(response.status, response.data)
+        return response
 
     def build_permission_overwrite_url(
         self,
@@ -403,7 +589,7 @@ class DiscordInteractions(DiscordInteractionsBlueprint):
                     "You must supply either a command ID or a Command instance."
                 )
 
-        url = f"{self.DISCORD_BASE_URL}/applications/{self.discord_client_id}/guilds/{guild_id}/commands/{command_id}/permissions"
+        url = f"{self._application_url}/guilds/{guild_id}/commands/{command_id}/permissions"
 
         return url
 
@@ -439,13 +625,13 @@ class DiscordInteractions(DiscordInteractionsBlueprint):
             command_id=command_id,
         )
 
-        response = requests.get(
+        response = self._discord_request(
+            "GET",
             url,
             headers=self.auth_headers(),
         )
-        response.raise_for_status()
 
-        return [Permission.from_dict(perm) for perm in response.json()]
+        return [Permission.from_dict(perm) for perm in orjson.loads(response.data)]
 
     def set_permission_overwrites(
         self,
@@ -475,12 +661,12 @@ class DiscordInteractions(DiscordInteractionsBlueprint):
             command_id=command_id,
         )
 
-        response = requests.put(
+        self._discord_request(
+            "PUT",
             url,
             headers=self.auth_headers(),
             json={"permissions": [perm.dump() for perm in permissions]},
         )
-        response.raise_for_status()
 
 
     def register_blueprint(self, blueprint: DiscordInteractionsBlueprint):
@@ -498,6 +684,7 @@ class DiscordInteractions(DiscordInteractionsBlueprint):
         """
         self.discord_commands.update(blueprint.discord_commands)
         self.custom_id_handlers.update(blueprint.custom_id_handlers)
+        self._custom_id_parameters.update(blueprint._custom_id_parameters)
         self.deta_actions.update(blueprint.deta_actions)
 
     def run_command(self, data: dict):
@@ -543,7 +730,9 @@ class DiscordInteractions(DiscordInteractionsBlueprint):
 
         context = Context.from_data(self, data)
         handler = self.custom_id_handlers[context.primary_id]
-        args = context.create_handler_args(handler)
+        args = context.create_handler_args(
+            handler, self._custom_id_parameters.get(context.primary_id)
+        )
         result = handler(context, *args)
 
         if isinstance(result, Modal):
@@ -552,6 +741,8 @@ class DiscordInteractions(DiscordInteractionsBlueprint):
             else:
                 raise ValueError("Cannot return a Modal to that interaction type.")
 
+        if isinstance(result, Message):
+            return result
         return Message.from_return_value(result)
 
     def run_autocomplete(self, data: dict):
@@ -602,23 +793,30 @@ class DiscordInteractions(DiscordInteractionsBlueprint):
         if signature is None or timestamp is None:
             self.abort(401, "Missing signature or timestamp")
 
-        message = f"{timestamp}{request['raw_data'].decode('UTF-8')}".encode("UTF-8")
-        verify_key = VerifyKey(bytes.fromhex(self.discord_public_key))
+        if not (timestamp.isascii() and timestamp.isdigit()):
+            self.abort(401, "Bad signature format")
+        try:
+            signature = bytes.fromhex(signature)
+        except ValueError:
+            self.abort(401, "Bad signature format")
+        # Ed25519 signatures are always 64 bytes. This also guarantees the boundary
+        # when the signature is passed to PyNaCl combined with the message below
+        if len(signature) != 64:
+            self.abort(401, "Bad signature format")
+
+        timestamp = timestamp.encode("UTF-8")
+        if self._verify_key is None:
+            self._verify_key = VerifyKey(bytes.fromhex(self.discord_public_key))
+        # PyNaCl verifies a signature followed by the message, so building that directly
+        # avoids it concatenating the signature onto another copy of the whole body
+        signed_message = b"".join((signature, timestamp, request['raw_data']))
         try:
-            verify_key.verify(message, bytes.fromhex(signature))
+            self._verify_key.verify(signed_message)
         except BadSignatureError:
             try:
-                body = (
-                    json.dumps(
-                        json.loads(
-                            request['raw_data'].decode('UTF-8')
-                        ),
-                        separators=(',', ':'),
-                    )
-                    .encode('UTF-8')
-                )
-                message = f"{timestamp}{body}".encode("UTF-8")
-                verify_key.verify(message, bytes.fromhex(signature))
+                # orjson output is already compact, with no whitespace between separators
+                body = orjson.dumps(orjson.loads(request['raw_data']))
+                self._verify_key.verify(b"".join((signature, timestamp, body)))
             except BadSignatureError:
                 self.abort(401, "Incorrect Signature")
             else:
@@ -637,21 +835,17 @@ class DiscordInteractions(DiscordInteractionsBlueprint):
         """
         self.verify_signature(request)
 
-        interaction_type = request["json"].get("type")
-        if interaction_type == InteractionType.PING:
+        data = request["json"]
+        interaction_type = data.get("type")
+        if interaction_type == _PING:
             return PongResponse()
-        elif interaction_type == InteractionType.APPLICATION_COMMAND:
-            return self.run_command(request["json"])
-        elif interaction_type == InteractionType.MESSAGE_COMPONENT:
-            return self.run_handler(request["json"])
-        elif interaction_type == InteractionType.APPLICATION_COMMAND_AUTOCOMPLETE:
-            return self.run_autocomplete(request["json"])
-        elif interaction_type == InteractionType.MODAL_SUBMIT:
-            return self.run_handler(request["json"], allow_modal=False)
-        else:
+
+        handler = self._interaction_handlers.get(interaction_type)
+        if handler is None:
             raise RuntimeWarning(
                 f"Interaction type {interaction_type} is not yet supported"
             )
+        return handler(data)
     
     def route(self, route_path: str):
         """Decorator to register a custom route.
@@ -675,29 +869,44 @@ class DiscordInteractions(DiscordInteractionsBlueprint):
         (WSGI)
         """
         try:
-            data = environ.copy()
             raw_data = environ["wsgi.input"].read()
-            if raw_data:
-                data["json"] = json.loads(raw_data.decode("UTF-8"))
-                data["raw_data"] = raw_data
+            path = environ.get("PATH_INFO", '').split("?", 1)[0] or '/'
 
-            data["path"] = data.get("PATH_INFO", '').split("?", 1)[0] or '/'
-
-
-            if data["QUERY_STRING"]:
-                data["query_dict"] = dict(args.split('=', 1) for args in data["QUERY_STRING"].split("&"))
-            else:
-                data["query_dict"] = {}
             ### Handle Discord
-            if data['path'] == '/discord':
+            if path == '/discord':
+                # Interactions only need the body and the signature headers, not a copy of the whole environ
+                data = {
+                    "path": path,
+                    "json": orjson.loads(raw_data),
+                    "raw_data": raw_data,
+                    "HTTP_X_SIGNATURE_ED25519": environ.get("HTTP_X_SIGNATURE_ED25519"),
+                    "HTTP_X_SIGNATURE_TIMESTAMP": environ.get("HTTP_X_SIGNATURE_TIMESTAMP"),
+                }
+                # Discord sends PINGs to check the endpoint, answer them without going through the handlers
+                if data["json"].get("type") == _PING:
+                    self.verify_signature(data)
+                    start_response("200 OK", [("Content-Type", "application/json")])
+                    return [_PONG_PAYLOAD]
                 result = self.handle_interaction(data)
                 response, mimetype = result.encode()
                 status = "200 OK"
                 response_headers = [("Content-Type", mimetype)]
                 start_response(status, response_headers)
                 return [response]
+
+            data = environ.copy()
+            if raw_data:
+                data["json"] = orjson.loads(raw_data)
+                data["raw_data"] = raw_data
+
+            data["path"] = path
+
+            if data["QUERY_STRING"]:
+                data["query_dict"] = dict(args.split('=', 1) for args in data["QUERY_STRING"].split("&"))
+            else:
+                data["query_dict"] = {}
             ### Catch a common mistake
-            elif (  # If you set it like `https://example.deta.app` instead of `https://example.deta.app/discord`
+            if (  # If you set it like `https://example.deta.app` instead of `https://example.deta.app/discord`
                 data['path'] == '/' 
                 and '/' not in self.__routes 
                 and "Discord-Interactions" in data.get("HTTP_USER_AGENT")
@@ -712,7 +921,7 @@ class DiscordInteractions(DiscordInteractionsBlueprint):
                 result = self.run_deta_action(event)
                 if result:
                     start_response("200 OK", [("Content-Type", "application/json")])
-                    return [json.dumps({"result": result}).encode("UTF-8")]
+                    return [orjson.dumps({"result": result})]
                 else:
                     start_response('200 OK', [])
                     return []
@@ -726,13 +935,13 @@ class DiscordInteractions(DiscordInteractionsBlueprint):
             status = err.http_code
             response_headers = [("Content-Type", "application/json")]
             start_response(status, response_headers)
-            return [json.dumps({"error": status}).encode("UTF-8")]
+            return [orjson.dumps({"error": status})]
         except Exception as err:
             import traceback
             traceback.print_exc()
             print(f"Unexpected error: {err}", flush=True)
             start_response('500 Internal Server Error', [("Content-Type", "application/json")])
-            return [json.dumps({"error": str(type(err))}).encode("UTF-8")]
+            return [orjson.dumps({"error": str(type(err))})]
 
     def abort(self, code: int, reason: str) -> NoReturn:
         raise AbortError(f"{code} {reason}")
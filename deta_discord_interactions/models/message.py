@@ -1,8 +1,8 @@
 import dataclasses
-import json
 from typing import Optional
 from datetime import datetime
 
+import orjson
 import requests_toolbelt
 
 from deta_discord_interactions.enums import ResponseType
@@ -226,11 +226,11 @@ class Message(LoadableDataclass):
                 "data": payload,
             }
 
-        payload_json = json.dumps(payload)
+        payload_json = orjson.dumps(payload)
 
         if self.files:
             fields = [
-                ("payload_json", (None, payload_json.encode(), "application/json"))
+                ("payload_json", (None, payload_json, "application/json"))
             ]
 
             for i, file in enumerate(self.files):
@@ -242,4 +242,4 @@ class Message(LoadableDataclass):
 
             return (multipart.to_string(), multipart.content_type)
         else:
-            return (payload_json.encode('UTF-8'), "application/json")
+            return (payload_json, "application/json")
@@ -1,4 +1,5 @@
 import os
+import time
 os.environ["DISCORD_CLIENT_ID"] = "123"
 os.environ["DISCORD_PUBLIC_KEY"] = "123"
 os.environ["DISCORD_CLIENT_SECRET"] = "123"
@@ -21,6 +22,15 @@ def discord():
     return DiscordInteractions()
 
 
+@pytest.fixture()
+def registering_discord():
+    "An app that sends its requests to Discord, holding a token that is still valid"
+    app = DiscordInteractions()
+    app.DONT_REGISTER_WITH_DISCORD = False
+    app.discord_token = {"access_token": "token", "expires_on": time.time() + 3600}
+    return app
+
+
 @pytest.fixture(scope="module")
 def oauth_discord():
     app = DiscordInteractions()
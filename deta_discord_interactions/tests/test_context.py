@@ -262,3 +262,12 @@ def test_message_command_argument(discord, client):
 
     with client.context(Context(target_message=Message(content="This is a test."))):
         assert client.run("repeat").content == "I repeat, this is a test."
+
+
+def test_auth_headers_copy(discord):
+    context = Context(discord=discord)
+    headers = context.auth_headers
+    headers["Content-Type"] = "text/plain"
+
+    assert "Content-Type" not in context.auth_headers
+    assert "Content-Type" not in discord.auth_headers()
@@ -1,3 +1,5 @@
+import dataclasses
+
 from deta_discord_interactions import Message, ActionRow, Button, ButtonStyles
 
 
@@ -95,3 +97,25 @@ def test_stateful_handler(discord, client):
     client.run("click_counter")
     response = discord.custom_id_handlers['click_handler'](None, 0)
     assert response.content == "1 clicks"
+
+
+def test_callable_object_handler(discord, client):
+    @dataclasses.dataclass
+    class Counter:
+        step: int
+
+        def __call__(self, ctx, count: int):
+            return f"{count + self.step} clicks"
+
+    discord.add_custom_handler(Counter(step=2), "counter_handler")
+
+    assert client.run_handler("counter_handler", "40").content == "42 clicks"
+
+    response = discord.run_handler({
+        "type": 3,
+        "id": 1,
+        "token": "",
+        "data": {"custom_id": "counter_handler\n40", "component_type": 2},
+        "member": {"id": 1, "nick": "", "user": {"id": 1, "username": "test"}},
+    })
+    assert response.content == "42 clicks"
@@ -1,7 +1,9 @@
 import json
 import io
+import warnings
 import pytest
 import requests
+from nacl.signing import SigningKey
 
 from deta_discord_interactions import (
     DiscordInteractions,
@@ -56,3 +58,94 @@ def test_wsgi(discord: DiscordInteractions):
     assert resp["type"] == ResponseType.CHANNEL_MESSAGE_WITH_SOURCE
 
     assert resp["data"]["content"] == "Ping Pong!"
+
+
+@pytest.mark.parametrize("signature, timestamp", [
+    ("not hex", "1700000000"),
+    (" ".join(["ab"] * 43)[:128], "1700000000"),
+    ("ab" * 64, "17²"),
+])
+def test_wsgi_bad_signature_format(signature, timestamp):
+    discord = DiscordInteractions()
+    discord.DONT_VALIDATE_SIGNATURE = False
+
+    environ = {
+        "wsgi.input": io.BytesIO(json.dumps({"type": InteractionType.PING}).encode('UTF-8')),
+        "PATH_INFO": "/discord",
+        'QUERY_STRING': '',
+        "HTTP_X_SIGNATURE_ED25519": signature,
+        "HTTP_X_SIGNATURE_TIMESTAMP": timestamp,
+    }
+
+    def _start_response(status, headers):
+        assert status == "401 Bad signature format"
+
+    response = discord(environ, _start_response)
+    assert json.loads(response[0].decode('UTF-8'))["error"] == "401 Bad signature format"
+
+
+def test_wsgi_ping(discord: DiscordInteractions):
+    environ = {
+        "wsgi.input": io.BytesIO(json.dumps({"type": InteractionType.PING}).encode('UTF-8')),
+        "PATH_INFO": "/discord",
+        'QUERY_STRING': '',
+    }
+
+    def _start_response(status, headers):
+        assert status == "200 OK"
+        assert headers == [('Content-Type', 'application/json')]
+
+    response = discord(environ, _start_response)
+    assert json.loads(response[0].decode('UTF-8')) == {"type": ResponseType.PONG}
+
+
+@pytest.fixture()
+def signed_discord(monkeypatch):
+    signing_key = SigningKey.generate()
+    monkeypatch.setenv("DISCORD_PUBLIC_KEY", signing_key.verify_key.encode().hex())
+    monkeypatch.setenv("DONT_VALIDATE_SIGNATURE", "False")
+    return DiscordInteractions(), signing_key
+
+
+def _signed_call(discord, body: bytes, signed_body: bytes, signing_key: SigningKey):
+    timestamp = b"1700000000"
+    environ = {
+        "wsgi.input": io.BytesIO(body),
+        "PATH_INFO": "/discord",
+        'QUERY_STRING': '',
+        "HTTP_X_SIGNATURE_ED25519": signing_key.sign(timestamp + signed_body).signature.hex(),
+        "HTTP_X_SIGNATURE_TIMESTAMP": timestamp.decode(),
+    }
+    statuses = []
+    response = discord(environ, lambda status, headers: statuses.append(status))
+    return statuses[0], json.loads(response[0].decode('UTF-8'))
+
+
+def test_wsgi_valid_signature(signed_discord):
+    discord, signing_key = signed_discord
+    body = b'{"type":1}'
+
+    # The unmodified body must verify directly, without the whitespace fallback
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        status, response = _signed_call(discord, body, body, signing_key)
+    assert status == "200 OK"
+    assert response == {"type": ResponseType.PONG}
+
+
+def test_wsgi_incorrect_signature(signed_discord):
+    discord, signing_key = signed_discord
+
+    status, response = _signed_call(discord, b'{"type":1}', b'{"type":2}', signing_key)
+    assert status == "401 Incorrect Signature"
+    assert response["error"] == "401 Incorrect Signature"
+
+
+def test_wsgi_signature_whitespace_fallback(signed_discord):
+    "Bodies re-formatted with whitespace are still accepted if Discord signed the compact form"
+    discord, signing_key = signed_discord
+
+    with pytest.warns(UserWarning):
+        status, response = _signed_call(discord, b'{"type": 1}', b'{"type":1}', signing_key)
+    assert status == "200 OK"
+    assert response == {"type": ResponseType.PONG}
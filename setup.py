@@ -18,7 +18,7 @@ setup(
     zip_safe=False,
     include_package_data=True,
     platforms="any",
-    install_requires=["requests", "PyNaCl", "requests-toolbelt", "deta"],
+    install_requires=["requests", "urllib3", "orjson", "PyNaCl", "requests-toolbelt", "deta"],
     tests_require=["pytest"],
     classifiers=[
         "Environment :: Web Environment",